@@ -33,11 +33,18 @@ To do this, use one of the commands above and replace `python` with
 2. Models has been removed. But leaving infrastructure here for qe_apidoc
 in the event we need it in the future
 
+3. This file only uses the standard library and keeps its helpers as small
+module level functions, so it also runs under PyPy, e.g. in CI loops that
+regenerate the docs often. Use `pypy3` in place of `python` above:
+$ pypy3 qe_apidoc.py
+
 
 """
 import os
+import re
 import sys
-from glob import glob
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 
 ######################
@@ -47,52 +54,7 @@ from glob import glob
 module_template = """{mod_name}
 {equals}
 
-.. automodule:: quantecon.{mod_name}
-    :members:
-    :undoc-members:
-    :show-inheritance:
-"""
-
-game_theory_module_template = """{mod_name}
-{equals}
-
-.. automodule:: quantecon.game_theory.{mod_name}
-    :members:
-    :undoc-members:
-    :show-inheritance:
-"""
-
-game_generators_module_template = """{mod_name}
-{equals}
-
-.. automodule:: quantecon.game_theory.game_generators.{mod_name}
-    :members:
-    :undoc-members:
-    :show-inheritance:
-"""
-
-markov_module_template = """{mod_name}
-{equals}
-
-.. automodule:: quantecon.markov.{mod_name}
-    :members:
-    :undoc-members:
-    :show-inheritance:
-"""
-
-random_module_template = """{mod_name}
-{equals}
-
-.. automodule:: quantecon.random.{mod_name}
-    :members:
-    :undoc-members:
-    :show-inheritance:
-"""
-
-util_module_template = """{mod_name}
-{equals}
-
-.. automodule:: quantecon.util.{mod_name}
+.. automodule:: {module}
     :members:
     :undoc-members:
     :show-inheritance:
@@ -159,9 +121,91 @@ split_file_template = """{name}
 ######################
 
 
+@lru_cache(maxsize=None)
 def source_join(f_name):
     return os.path.join("source", f_name)
 
+
+@lru_cache(maxsize=None)
+def _bar(n):
+    """Return the rst underline of length `n`, shared between callers."""
+    return "=" * n
+
+
+def _percent_template(template):
+    """
+    Translate a str.format template with plain `{field}` placeholders into
+    the equivalent %-style template, so its placeholders are parsed once
+    instead of at every render. The result is rendered as
+    ``tmpl % {"field": value, ...}``.
+    """
+    return re.sub(r"\{(\w+)\}", r"%(\1)s", template.replace("%", "%%"))
+
+
+# Equivalent of the glob pattern "[a-z0-9]*.py", compiled once
+_py_module_match = re.compile(r"[a-z0-9].*\.py").fullmatch
+
+
+def _list_py(path, exclude=()):
+    """
+    Return the sorted names (without the .py extension) of the python
+    files in `path` whose name starts with a lowercase letter or digit,
+    skipping the file names listed in `exclude`. A single os.scandir pass
+    is used, so no stat call is needed per entry.
+    """
+    return sorted(e.name[:-3] for e in os.scandir(path)
+                  if _py_module_match(e.name) and
+                  e.name not in exclude and e.is_file())
+
+
+def write_if_changed(path, text):
+    """
+    Write `text` to `path` unless the file already holds exactly that
+    content. Leaving unchanged files untouched keeps their mtime, so
+    Sphinx only re-reads the documents that actually changed. The text is
+    encoded once and written in binary mode with a single unbuffered
+    write.
+    """
+    payload = text.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            old = f.read()
+    except FileNotFoundError:
+        old = None
+    if old == payload:
+        return
+    with open(path, "wb", buffering=0) as f:
+        f.write(payload)
+
+########################
+## Compiled templates ##
+########################
+
+# All templates are specialized once at import time: placeholders are
+# translated to %-format and the parts that only depend on constants are
+# pre-rendered, so the main functions never re-parse a format string.
+
+# Module template rendered once per module
+_module_pct = _percent_template(module_template)
+
+# index.rst of the single layout, split around the generated toctree
+_all_index_header, _all_index_footer = all_index_template.split("{generated}")
+
+# Subpackage index pages: the title and underline only depend on the
+# (constant) folder name, so the header is rendered here and only the
+# list of files is filled in when writing.
+_split_file_names = {"game_theory": "Game Theory",
+                     "markov": "Markov",
+                     "random": "Random",
+                     "tools": "Tools",
+                     "util": "Utilities",
+                     }
+_split_file_header, _split_file_footer = split_file_template.split("{files}")
+_split_file_header_pct = _percent_template(_split_file_header)
+_split_file_headers = {
+    f: _split_file_header_pct % {"name": name, "equals": _bar(len(name))}
+    for f, name in _split_file_names.items()}
+
 ####################
 ## Main functions ##
 ####################
@@ -169,143 +213,83 @@ def source_join(f_name):
 
 def all_auto():
     # Get list of module names
-    mod_names = glob("../quantecon/[a-z0-9]*.py")
-    mod_names = list(map(lambda x: x.split('/')[-1], mod_names))
+    mod_names = _list_py("../quantecon")
 
     # Ensure source/modules directory exists
-    if not os.path.exists(source_join("modules")):
-        os.makedirs(source_join("modules"))
+    os.makedirs(source_join("modules"), exist_ok=True)
 
     # Write file for each module
-    for mod in mod_names:
-        name = mod.split(".")[0]  # drop .py ending
+    for name in mod_names:
         new_path = os.path.join("source", "modules", name + ".rst")
-        with open(new_path, "w") as f:
-            gen_module(name, f)
+        equals = _bar(len(name))
+        write_if_changed(new_path, _module_pct % {
+            "mod_name": name, "equals": equals,
+            "module": "quantecon." + name})
 
     # write index.rst file to include these autogenerated files
-    with open(source_join("index.rst"), "w") as index:
-        generated = "\n   ".join(list(map(lambda x: "modules/" + x.split(".")[0],
-                                     mod_names)))
-        temp = all_index_template.format(generated=generated)
-        index.write(temp)
+    temp = "".join((_all_index_header,
+                    "\n   ".join("modules/" + m for m in mod_names),
+                    _all_index_footer))
+    write_if_changed(source_join("index.rst"), temp)
 
 
 def model_tool():
-    # list file names with game_theory
-    game_theory_files = glob("../quantecon/game_theory/[a-z0-9]*.py")
-    game_theory = list(map(lambda x: x.split('/')[-1][:-3], game_theory_files))
-    # Alphabetize
-    game_theory.sort()
-
-    # list file names with game_theory/game_generators
-    game_generators_files = glob("../quantecon/game_theory/game_generators/[a-z0-9]*.py")
-    game_generators = list(
-        map(lambda x: x.split('/')[-1][:-3], game_generators_files))
-    # Alphabetize
-    game_generators.sort()
-
-    # list file names with markov
-    markov_files = glob("../quantecon/markov/[a-z0-9]*.py")
-    markov = list(map(lambda x: x.split('/')[-1][:-3], markov_files))
-    # Alphabetize
-    markov.sort()
-
-    # list file names with random
-    random_files = glob("../quantecon/random/[a-z0-9]*.py")
-    random = list(map(lambda x: x.split('/')[-1][:-3], random_files))
-    # Alphabetize
-    random.sort()
+    # list file names of each subpackage (alphabetized)
+    game_theory = _list_py("../quantecon/game_theory")
+    game_generators = _list_py("../quantecon/game_theory/game_generators")
+    markov = _list_py("../quantecon/markov")
+    random = _list_py("../quantecon/random")
+    util = _list_py("../quantecon/util")
 
     # list file names of tools (base level modules)
-    tool_files = glob("../quantecon/[a-z0-9]*.py")
-    tools = list(map(lambda x: x.split('/')[-1][:-3], tool_files))
-    # Alphabetize
-    tools.remove("version")
-    tools.sort()
-
-    # list file names of utilities
-    util_files = glob("../quantecon/util/[a-z0-9]*.py")
-    util = list(map(lambda x: x.split('/')[-1][:-3], util_files))
-    # Alphabetize
-    util.sort()
-
-    for folder in ["game_theory", "markov", "random", "tools", "util"]:
-        if not os.path.exists(source_join(folder)):
-            os.makedirs(source_join(folder))
-
-    # Write file for each game_theory file
-    for mod in game_theory:
-        new_path = os.path.join("source", "game_theory", mod + ".rst")
-        with open(new_path, "w") as f:
-            equals = "=" * len(mod)
-            f.write(game_theory_module_template.format(mod_name=mod, equals=equals))
-
-    for mod in game_generators:
-        new_path = os.path.join("source", "game_theory", "game_generators", mod + ".rst")
-        with open(new_path, "w") as f:
-            equals = "=" * len(mod)
-            f.write(game_generators_module_template.format(
-                mod_name=mod, equals=equals))
-        #Add sudirectory to flat game_theory list for index file
-        game_theory.append("game_generators/{}".format(mod))
-
-    # Write file for each markov file
-    for mod in markov:
-        new_path = os.path.join("source", "markov", mod + ".rst")
-        with open(new_path, "w") as f:
-            equals = "=" * len(mod)
-            f.write(markov_module_template.format(mod_name=mod, equals=equals))
-
-    # Write file for each random file
-    for mod in random:
-        new_path = os.path.join("source", "random", mod + ".rst")
-        with open(new_path, "w") as f:
-            equals = "=" * len(mod)
-            f.write(random_module_template.format(mod_name=mod, equals=equals))
-
-    # Write file for each tool (base level modules)
-    for mod in tools:
-        new_path = os.path.join("source", "tools", mod + ".rst")
-        with open(new_path, "w") as f:
-            equals = "=" * len(mod)
-            f.write(module_template.format(mod_name=mod, equals=equals))
-
-    # Write file for each utility
-    for mod in util:
-        new_path = os.path.join("source", "util", mod + ".rst")
-        with open(new_path, "w") as f:
-            equals = "=" * len(mod)
-            f.write(util_module_template.format(mod_name=mod, equals=equals))
+    tools = _list_py("../quantecon", exclude=("version.py",))
+
+    for folder in ("game_theory", os.path.join("game_theory", "game_generators"),
+                   "markov", "random", "tools", "util"):
+        os.makedirs(source_join(folder), exist_ok=True)
+
+    # Write file for each module: (folder, package, module names)
+    jobs = [("game_theory", "quantecon.game_theory.", game_theory),
+            (os.path.join("game_theory", "game_generators"),
+             "quantecon.game_theory.game_generators.", game_generators),
+            ("markov", "quantecon.markov.", markov),
+            ("random", "quantecon.random.", random),
+            ("tools", "quantecon.", tools),
+            ("util", "quantecon.util.", util),
+            ]
+    paths, texts = [], []
+    for folder, package, mods in jobs:
+        for mod in mods:
+            paths.append(os.path.join("source", folder, mod + ".rst"))
+            equals = _bar(len(mod))
+            texts.append(_module_pct % {"mod_name": mod, "equals": equals,
+                                        "module": package + mod})
+
+    # The writes are pure I/O, so overlap them in a thread pool. Consuming
+    # the results re-raises any error from a worker.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(write_if_changed, paths, texts))
+
+    #Add subdirectory to flat game_theory list for index file
+    game_theory.extend("game_generators/" + mod for mod in game_generators)
 
     # write (index|models|tools).rst file to include autogenerated files
-    with open(source_join("index.rst"), "w") as index:
-        index.write(split_index_template)
-
-    gt = "game_theory/" + "\n   game_theory/".join(game_theory)
-    mark = "markov/" + "\n   markov/".join(markov)
-    rand = "random/" + "\n   random/".join(random)
-    tlz = "tools/" + "\n   tools/".join(tools)
-    utls = "util/" + "\n   util/".join(util)
+    write_if_changed(source_join("index.rst"), split_index_template)
+
     #-TocTree-#
-    toc_tree_list = {"game_theory": gt,
-                     "markov": mark,
-                     "tools": tlz,
-                     "random": rand,
-                     "util": utls,
+    toc_tree_list = {"game_theory": game_theory,
+                     "markov": markov,
+                     "tools": tools,
+                     "random": random,
+                     "util": util,
                      }
 
-    for f_name in ("game_theory", "markov", "random", "tools", "util"):
-        with open(source_join(f_name + ".rst"), "w") as f:
-            m_name = f_name
-            if f_name == "game_theory":
-                f_name = "Game Theory"                                             #Produce Nicer Title for Game Theory Module
-            if f_name == "util":
-                f_name = "Utilities"            #Produce Nicer Title for Utilities Module
-            temp = split_file_template.format(name=f_name.capitalize(),
-                                              equals="="*len(f_name),
-                                              files=toc_tree_list[m_name])
-            f.write(temp)
+    for f_name, header in _split_file_headers.items():
+        temp = "".join((header,
+                        "\n   ".join(f_name + "/" + m
+                                     for m in toc_tree_list[f_name]),
+                        _split_file_footer))
+        write_if_changed(source_join(f_name + ".rst"), temp)
 
 if __name__ == '__main__':
     if "single" in sys.argv[1:]: